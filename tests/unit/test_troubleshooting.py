@@ -0,0 +1,185 @@
+# Copyright 2026 The MathWorks, Inc.
+
+"""Tests for the log collection of the standalone troubleshooting script."""
+
+import importlib.util
+import io
+from pathlib import Path
+
+import pytest
+
+TROUBLESHOOTING_SCRIPT = (
+    Path(__file__).parents[2] / "troubleshooting" / "troubleshooting.py"
+)
+
+
+@pytest.fixture(name="troubleshooting", scope="module")
+def troubleshooting_fixture():
+    """Loads the troubleshooting script as a module, as it is not part of a package."""
+    spec = importlib.util.spec_from_file_location(
+        "troubleshooting", TROUBLESHOOTING_SCRIPT
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(name="small_tail")
+def small_tail_fixture(troubleshooting, monkeypatch):
+    """Shrinks the tail limits so that chunk and budget boundaries are exercised."""
+    monkeypatch.setattr(troubleshooting, "LOG_TAIL_LINES", 5)
+    monkeypatch.setattr(troubleshooting, "LOG_TAIL_MAX_BYTES", 64)
+    monkeypatch.setattr(troubleshooting, "LOG_TAIL_CHUNK_SIZE", 7)
+    return troubleshooting
+
+
+def _write_log(tmp_path, content: bytes) -> str:
+    log_file = tmp_path / "mwi.log"
+    log_file.write_bytes(content)
+    return str(log_file)
+
+
+def test_read_log_tail_empty_file(small_tail, tmp_path):
+    """Test that an empty log file results in no logs."""
+    # Arrange
+    log_file = _write_log(tmp_path, b"")
+
+    # Act
+    logs = small_tail.read_log_tail(log_file)
+
+    # Assert
+    assert logs == ""
+
+
+def test_read_log_tail_fewer_lines_than_limit(small_tail, tmp_path):
+    """Test that all lines are returned when the log has fewer lines than the limit."""
+    # Arrange
+    log_file = _write_log(tmp_path, b"a\nb\nc")
+
+    # Act
+    logs = small_tail.read_log_tail(log_file)
+
+    # Assert
+    assert logs == "a\nb\nc"
+
+
+@pytest.mark.parametrize(
+    "num_lines, expected_first_line",
+    [(5, 0), (6, 1)],
+    ids=["exactly the limit", "one more than the limit"],
+)
+def test_read_log_tail_line_limit(small_tail, tmp_path, num_lines, expected_first_line):
+    """Test that only the last LOG_TAIL_LINES lines are returned."""
+    # Arrange
+    lines = [f"l{i}" for i in range(num_lines)]
+    log_file = _write_log(tmp_path, ("\n".join(lines) + "\n").encode())
+
+    # Act
+    logs = small_tail.read_log_tail(log_file)
+
+    # Assert
+    assert logs.split("\n") == lines[expected_first_line:]
+
+
+@pytest.mark.parametrize(
+    "content, expected_lines",
+    [
+        (b"a\nb\n", ["a", "b"]),
+        (b"a\r\nb\r\n", ["a", "b"]),
+        (b"a\n\nb\n", ["a", "", "b"]),
+        (b"1\n2\n3\n4\n\n5\n", ["2", "3", "4", "", "5"]),
+        (b"1\n2\n3\n4\n5\n6\n\n\n\n", ["2", "3", "4", "5", "6"]),
+    ],
+    ids=[
+        "trailing newline",
+        "trailing carriage return and newline",
+        "blank line",
+        "blank line counts towards the limit",
+        "trailing blank lines do not count towards the limit",
+    ],
+)
+def test_read_log_tail_line_endings(small_tail, tmp_path, content, expected_lines):
+    """Test that trailing line endings are dropped and blank lines are kept."""
+    # Arrange
+    log_file = _write_log(tmp_path, content)
+
+    # Act
+    logs = small_tail.read_log_tail(log_file)
+
+    # Assert
+    assert logs.splitlines() == expected_lines
+
+
+def test_read_log_tail_over_max_bytes_keeps_first_line_whole(small_tail, tmp_path):
+    """Test that a line cut by the LOG_TAIL_MAX_BYTES budget is dropped."""
+    # Arrange
+    # 26 bytes per line, so the 64 byte budget ends in the middle of a line
+    lines = [f"line-{i:02}-" + "x" * 17 for i in range(30)]
+    log_file = _write_log(tmp_path, ("\n".join(lines) + "\n").encode())
+
+    # Act
+    logs = small_tail.read_log_tail(log_file)
+
+    # Assert
+    assert logs.split("\n") == lines[-2:]
+
+
+def test_read_log_tail_max_bytes_on_line_boundary(small_tail, tmp_path):
+    """Test that a line starting exactly at the LOG_TAIL_MAX_BYTES budget is kept."""
+    # Arrange
+    # 16 bytes per line, so the 64 byte budget starts exactly at a line
+    lines = [f"line-{i:02}-" + "x" * 7 for i in range(30)]
+    log_file = _write_log(tmp_path, ("\n".join(lines) + "\n").encode())
+
+    # Act
+    logs = small_tail.read_log_tail(log_file)
+
+    # Assert
+    assert logs.split("\n") == lines[-4:]
+
+
+def test_read_log_tail_single_line_over_max_bytes(small_tail, tmp_path):
+    """Test that nothing is returned when the last line alone exceeds the budget."""
+    # Arrange
+    log_file = _write_log(tmp_path, b"first\n" + b"x" * 100 + b"\n")
+
+    # Act
+    logs = small_tail.read_log_tail(log_file)
+
+    # Assert
+    assert logs == ""
+
+
+def test_collect_logs_from_logfile_tail(small_tail, tmp_path, monkeypatch):
+    """Test that only the tail of MWI_LOG_FILE is collected by default."""
+    # Arrange
+    lines = [f"l{i}" for i in range(10)]
+    monkeypatch.setenv(
+        "MWI_LOG_FILE", _write_log(tmp_path, ("\n".join(lines) + "\n").encode())
+    )
+    monkeypatch.delenv("MWI_TROUBLESHOOT_FULL_LOG", raising=False)
+    out = io.StringIO()
+
+    # Act
+    small_tail.collect_logs_from_logfile(out)
+
+    # Assert
+    assert out.getvalue().endswith("\n" + "\n".join(lines[-5:]))
+    assert "l4" not in out.getvalue()
+
+
+def test_collect_logs_from_logfile_full_log(small_tail, tmp_path, monkeypatch):
+    """Test that MWI_TROUBLESHOOT_FULL_LOG=true collects the whole MWI_LOG_FILE."""
+    # Arrange
+    lines = [f"line-{i:02}-" + "x" * i for i in range(30)]
+    monkeypatch.setenv(
+        "MWI_LOG_FILE", _write_log(tmp_path, ("\n".join(lines) + "\n").encode())
+    )
+    monkeypatch.setenv("MWI_TROUBLESHOOT_FULL_LOG", "true")
+    out = io.StringIO()
+
+    # Act
+    small_tail.collect_logs_from_logfile(out)
+
+    # Assert
+    assert out.getvalue().endswith("\n" + "\n".join(lines))
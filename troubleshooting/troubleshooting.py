@@ -3,37 +3,69 @@
 # This script is designed to be used in standalone manner and to maintain
 # that, it doesn't use utility functions present in the parent repository.
 
+import functools
+import io
 import os
 import platform
+import re
 import shutil
 import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
 from dataclasses import dataclass
+from importlib import metadata
 from pathlib import Path
-from typing import Final
+from typing import Final, Optional
 
 GREEN_OK: Final = "\033[32mOK\033[0m" if os.name != "nt" else "ok"
 RED_X: Final = "\033[31m X\033[0m" if os.name != "nt" else " X"
-OS_TYPE: Final = platform.system()
-
-
-def list_matlab():
+UNAME: Final = platform.uname()
+OS_TYPE: Final = UNAME.system
+PACKAGES_RE: Final = re.compile(r"jupyter|matlab-proxy|jupyter-matlab-proxy|notebook")
+ENV_VARS_RE: Final = re.compile(r"matlab|mw_|mwi_", re.IGNORECASE)
+COMMAND_TIMEOUT: Final = 10
+PYTHON_EXECUTABLES: Final = ("python", "python3")
+# Reports the interpreter version and its pip version from a single process,
+# without paying for the import of pip itself.
+PYTHON_PROBE: Final = """\
+import sys
+print("Python " + sys.version.split()[0])
+try:
+    import importlib.metadata as m
+    pip = m.distribution("pip")
+    print("pip %s from %s (python %d.%d)" % ((pip.version, pip.locate_file("pip")) + sys.version_info[:2]))
+except Exception:
+    pass
+"""
+# Version outputs keyed by the resolved executable path, so that aliases like
+# python and python3 pointing to the same binary are only probed once.
+_VERSION_CACHE: Final[dict] = {}
+_PYTHON_PROBE_CACHE: Final[dict] = {}
+# Only the end of the matlab-proxy log file is collected, unless
+# MWI_TROUBLESHOOT_FULL_LOG is set to true.
+LOG_TAIL_LINES: Final = 2000
+LOG_TAIL_MAX_BYTES: Final = 256 * 1024
+LOG_TAIL_CHUNK_SIZE: Final = 8 * 1024
+
+
+def list_matlab(out: io.StringIO) -> None:
     title, key = "MATLAB", "matlab"
     os_filter = OSFilter(OS_TYPE, key)
     handlers = [FindExecutableHandler(key)]
     status = EnvInfo(os_filter, TitleHandler(title), handlers)
-    return status.print()
+    status.print(out)
 
 
-def list_matlab_proxy_on_path():
+def list_matlab_proxy_on_path(out: io.StringIO) -> None:
     title, key = "matlab-proxy-app", "matlab-proxy-app"
     os_filter = OSFilter(OS_TYPE, key)
     handlers = [FindExecutableHandler(key)]
     status = EnvInfo(os_filter, TitleHandler(title), handlers)
-    return status.print()
+    status.print(out)
 
 
-def check_python_and_pip_installed():
+def check_python_and_pip_installed(out: io.StringIO) -> None:
     title, key = (
         "Python and pip executables",
         "python/pip",
@@ -45,67 +77,122 @@ def check_python_and_pip_installed():
         CommandVersionHandler("python3"),
     ]
     status = EnvInfo(os_filter, TitleHandler(title), handlers)
-    return status.print()
+    status.print(out)
 
 
-def os_info():
+def os_info(out: io.StringIO) -> None:
     title = "OS information"
     header = generate_header(title)
+    # platform.platform() inspects the libc of the interpreter, so it is left to
+    # this section which runs concurrently with the others instead of import time
     os_data = [
-        platform.system(),
-        platform.release(),
+        UNAME.system,
+        UNAME.release,
         platform.platform(),
-        platform.uname(),
+        UNAME,
         "\n",
     ]
-    return header + "\n".join(f"{cmd}" for cmd in os_data)
+    out.write(header)
+    out.write("\n".join(f"{cmd}" for cmd in os_data))
 
 
-def list_installed_packages():
+def list_installed_packages(out: io.StringIO) -> None:
     title = "Installed packages"
     key = "packages"
     os_filter = OSFilter(OS_TYPE, key)
-    handlers = [CommandProviderHandler(key, OS_TYPE)]
+    handlers = [FunctionOutputHandler(key, find_installed_packages)]
     env_info = EnvInfo(os_filter, TitleHandler(title), handlers)
-    return env_info.print()
+    env_info.print(out)
 
 
-def list_xvfb() -> str:
+def list_xvfb(out: io.StringIO) -> None:
     title, key = "Xvfb", "Xvfb"
     os_filter = OSFilter(OS_TYPE, key)
     handlers = [FindExecutableHandler(key)]
     status = EnvInfo(os_filter, TitleHandler(title), handlers)
-    return status.print()
+    status.print(out)
 
 
-def list_conda_related_information() -> str:
+def list_conda_related_information(out: io.StringIO) -> None:
     title, key = "Conda information", "conda"
     os_filter = OSFilter(OS_TYPE, key)
     handlers = [CommandVersionHandler(key)]
     status = EnvInfo(os_filter, TitleHandler(title), handlers)
-    return status.print()
+    status.print(out)
 
 
-def list_env_vars() -> str:
+def list_env_vars(out: io.StringIO) -> None:
     title = "Environment variables"
     key = "Env"
     os_filter = OSFilter(OS_TYPE, key)
-    handlers = [CommandProviderHandler(key, OS_TYPE)]
+    handlers = [FunctionOutputHandler(key, find_env_vars)]
     env_info = EnvInfo(os_filter, TitleHandler(title), handlers)
-    return env_info.print()
+    env_info.print(out)
 
 
 # collect mp logs
-def collect_logs_from_logfile() -> str:
+def collect_logs_from_logfile(out: io.StringIO) -> None:
     title = "matlab-proxy logs"
     header = generate_header(title)
     log_file = os.environ.get("MWI_LOG_FILE")
-    logs = []
+    logs = ""
     if log_file != None and os.path.exists(log_file):
-        with open(log_file, "r") as lf:
-            logs = lf.read().splitlines()
+        if os.environ.get("MWI_TROUBLESHOOT_FULL_LOG", "false").lower() == "true":
+            with open(log_file, "rb") as lf:
+                logs = lf.read().rstrip(b"\r\n").decode(errors="replace")
+        else:
+            logs = read_log_tail(log_file)
+
+    if logs:
+        out.write(header)
+        out.write(logs)
+
+
+def read_log_tail(log_file: str) -> str:
+    """Reads the last LOG_TAIL_LINES whole lines of the log file that fit within the
+    last LOG_TAIL_MAX_BYTES of it
 
-    return header + "\n".join(logs) if len(logs) != 0 else ""
+    Args:
+        log_file (str): path to the log file
+
+    Returns:
+        str: the trailing lines of the log file
+    """
+    with open(log_file, "rb") as lf:
+        size = pos = lf.seek(0, os.SEEK_END)
+        # The byte before the budget is read as well, to know whether the first
+        # line within the budget is whole
+        start = max(size - LOG_TAIL_MAX_BYTES - 1, 0)
+        chunks: list = []
+        newlines = 0
+        content_found = False
+        # One more newline than the number of lines is needed to know the first line is whole
+        while pos > start and newlines <= LOG_TAIL_LINES:
+            read_size = min(LOG_TAIL_CHUNK_SIZE, pos - start)
+            pos -= read_size
+            lf.seek(pos)
+            chunk = lf.read(read_size)
+            chunks.append(chunk)
+            # Trailing line endings are stripped below, so they don't separate lines
+            if not content_found:
+                chunk = chunk.rstrip(b"\r\n")
+                content_found = bool(chunk)
+            newlines += chunk.count(b"\n")
+
+    data = b"".join(reversed(chunks)).rstrip(b"\r\n")
+    cut = len(data)
+    for _ in range(LOG_TAIL_LINES):
+        cut = data.rfind(b"\n", 0, cut)
+        if cut == -1:
+            break
+
+    if cut != -1:
+        data = data[cut + 1 :]
+    elif size > LOG_TAIL_MAX_BYTES:
+        # The byte budget ends before the start of the file, drop the partial first line
+        first_newline = data.find(b"\n")
+        data = data[first_newline + 1 :] if first_newline != -1 else b""
+    return data.decode(errors="replace")
 
 
 class EnvInfo:
@@ -117,13 +204,15 @@ class EnvInfo:
         self.title_handler = title_handler
         self.handlers = handlers
 
-    def print(self):
+    def print(self, out: io.StringIO) -> None:
         if self.filter.filter():
             title = self.title_handler.execute()
-            output = "\n".join(h.execute() for h in self.handlers if h.execute())
-            return "\n".join([title, output]) if output else ""
-        else:
-            return ""
+            outputs = (h.execute() for h in self.handlers)
+            output = "\n".join(op for op in outputs if op)
+            if output:
+                out.write(title)
+                out.write("\n")
+                out.write(output)
 
 
 # Filters
@@ -173,30 +262,6 @@ class OptionalFilter:
         return self.data[self.key]
 
 
-class CommandProvider:
-    """Provides OS-specific command alternatives"""
-
-    def __init__(self, os_type: str, key: str) -> None:
-        self.os_type = os_type
-        self.key = key
-        self.data = {
-            "Env": {
-                "Linux": 'env | grep -iE "^[^=]*matlab|^[^=]*mw_|^[^=]*mwi_"',
-                "Windows": 'set | findstr /IR "^[^=]*matlab ^[^=]*mw_ ^[^=]*mwi_"',
-                "Darwin": 'env | grep -iE "^[^=]*matlab|^[^=]*mw_|^[^=]*mwi_"',
-            },
-            "packages": {
-                "Linux": 'python -m pip list | grep -E "jupyter|matlab-proxy|jupyter-matlab-proxy|notebook"',
-                "Windows": 'python -m pip list | findstr /IR "jupyter matlab-proxy jupyter-matlab-proxy notebook"',
-                "Darwin": 'python -m pip list | grep -E "jupyter|matlab-proxy|jupyter-matlab-proxy|notebook"',
-            },
-        }
-
-    def get_command(self):
-        result = self.data.get(self.key)
-        return result if result is None else result[self.os_type]
-
-
 # handlers
 class TitleHandler:
     """Returns the title for the command block"""
@@ -208,20 +273,16 @@ class TitleHandler:
         return generate_header(self.title)
 
 
-class CommandProviderHandler:
-    """Handler to apply the command provider pattern to the desired commands"""
+class FunctionOutputHandler:
+    """Handler to apply the in-process function pattern to the desired information"""
 
-    def __init__(self, key: str, os_type: str) -> None:
+    def __init__(self, key: str, func) -> None:
         self.key = key
-        self.os_type = os_type
+        self.func = func
 
     def execute(self):
         is_suggestion_optional = OptionalFilter(self.key).filter()
-
-        # Get the command from the command provider
-        cmd_provider = CommandProvider(self.os_type, self.key)
-        cmd = cmd_provider.get_command()
-        rep: Report = process_output(exec_command, is_suggestion_optional, cmd)
+        rep: Report = process_output(self.func, is_suggestion_optional)
         return str(rep)
 
 
@@ -237,19 +298,6 @@ class CommandVersionHandler:
         return "".join(str(op) for op in outputs)
 
 
-class CommandOutputHandler:
-    """Handler to apply the command output pattern to the desired commands"""
-
-    def __init__(self, key: str, cmd: str) -> None:
-        self.key = key
-        self.cmd = cmd
-
-    def execute(self):
-        is_suggestion_optional = OptionalFilter(self.key).filter()
-        rep: Report = process_output(exec_command, is_suggestion_optional, self.cmd)
-        return str(rep)
-
-
 class FindExecutableHandler:
     """Handler to apply the find executable pattern to the desired commands"""
 
@@ -304,7 +352,7 @@ def find_executable(*args) -> list:
     """
     output: list = []
     for name in args:
-        executable_path = shutil.which(name)
+        executable_path = _which(name, os.environ.get("PATH"))
         real_path = real_executable_path = None
         # Using readlink to find the actual path of the executable, if one exists
         with suppress(OSError):
@@ -325,6 +373,51 @@ def find_executable(*args) -> list:
     return output
 
 
+def find_installed_packages() -> list:
+    """Lists the installed python packages relevant to matlab-proxy without spawning a subprocess
+
+    Returns:
+        list: containing the filtered package names along with their versions
+    """
+    packages: dict = {}
+    # Distributions are yielded in sys.path order, so the first copy of a package
+    # is the one that gets imported and must not be overwritten by hidden copies.
+    for dist in metadata.distributions():
+        name = dist.metadata["Name"]
+        if not name:
+            continue
+        normalized_name = re.sub(r"[-_.]+", "-", name).lower()
+        if PACKAGES_RE.search(normalized_name):
+            packages.setdefault(normalized_name, f"{name} {dist.version}")
+    return [
+        cmd_only_output(
+            "packages",
+            "\n".join(packages[name] for name in sorted(packages)),
+            False,
+        )
+    ]
+
+
+def find_env_vars() -> list:
+    """Lists the environment variables relevant to matlab-proxy without spawning a subprocess
+
+    Returns:
+        list: containing the filtered environment variables
+    """
+    env_vars = [
+        f"{name}={value}"
+        for name, value in os.environ.items()
+        if ENV_VARS_RE.search(name)
+    ]
+    return [cmd_only_output("Env", "\n".join(env_vars), False)]
+
+
+@functools.lru_cache(maxsize=64)
+def _which(name: str, path: Optional[str]) -> Optional[str]:
+    """Memoized shutil.which, keyed on PATH so that changes to it are honoured"""
+    return shutil.which(name, path=path)
+
+
 def process_output(func, is_suggestion_optional, *args) -> Report:
     """Higher-order helper function that calls find_executable/exec_command and primes the output for reporting
 
@@ -392,54 +485,158 @@ def prettify(boundary_filler=" ", text_arr=[]) -> str:
         [str]: Prettified String
     """
 
-    import sys
-
-    if not sys.stdout.isatty():
+    size = _get_terminal_size()
+    if size is None:
         return (
             "\n============================\n"
             + "\n".join(text_arr)
             + "\n============================\n"
         )
 
-    size = os.get_terminal_size()
     cols, _ = size.columns, size.lines
     if any(len(text) > cols for text in text_arr):
-        result = ""
-        for text in text_arr:
-            result += text + "\n"
-        return result
+        return "".join(text + "\n" for text in text_arr)
     upper = "\n" + "".ljust(cols, boundary_filler) + "\n" if len(text_arr) > 0 else ""
     lower = "".ljust(cols, boundary_filler) if len(text_arr) > 0 else ""
 
-    content = ""
-    for text in text_arr:
-        content += text.center(cols) + "\n"
-    result = upper + content + lower
-    return result
+    content = "".join(text.center(cols) + "\n" for text in text_arr)
+    return "".join([upper, content, lower])
+
+
+@functools.lru_cache(maxsize=1)
+def _get_terminal_size() -> Optional[os.terminal_size]:
+    """Memoized os.get_terminal_size, cleared at the start of every report
+
+    Returns:
+        os.terminal_size: size of the terminal, None if stdout is not a terminal
+    """
+    return os.get_terminal_size() if sys.stdout.isatty() else None
 
 
 def exec_command(*args) -> list:
-    """A utility to run a custom command and gather output.
+    """A utility to run custom commands and gather output.
+    Each command is a list of arguments and is executed without a shell.
 
     Returns:
-        list: of outputs that are returned by the function
+        list: of outputs that are returned by the function, in the order of the commands
     """
-    output: list = []
-    for cmd in args:
-        try:
-            completed_process = subprocess.run(
-                cmd, shell=True, capture_output=True, timeout=10, text=True
-            )
-            output.append(
-                cmd_only_output(
-                    cmd,
-                    completed_process.stdout.strip() + completed_process.stderr.strip(),
-                    False if completed_process.stderr == "" else True,
-                )
+    for argv in args:
+        if isinstance(argv, str):
+            raise TypeError(f"Expected a list of arguments, got the string {argv!r}")
+    return [_run_one(argv) for argv in args]
+
+
+def _run_one(argv: list) -> cmd_only_output:
+    """Runs a single command without a shell and wraps its output for reporting
+
+    Args:
+        argv (list): command to be executed, as a list of arguments
+
+    Returns:
+        cmd_only_output: output of the executed command
+    """
+    cmd = " ".join(argv)
+    try:
+        # On timeout, subprocess.run kills and reaps the process before raising
+        completed_process = subprocess.run(
+            argv,
+            capture_output=True,
+            timeout=COMMAND_TIMEOUT,
+            text=True,
+            errors="replace",
+        )
+    except subprocess.TimeoutExpired:
+        return cmd_only_output(cmd, f"{cmd} command timed out!", True)
+    except OSError as err:
+        return cmd_only_output(cmd, f"{cmd} command failed to run: {err}", True)
+
+    return cmd_only_output(
+        cmd,
+        completed_process.stdout.strip() + completed_process.stderr.strip(),
+        False if completed_process.stderr == "" else True,
+    )
+
+
+def find_version(cmd: str) -> list:
+    """Finds the version of an executable, reusing earlier probes of the same binary.
+    Python interpreters report both their own and their pip's version from a single
+    process, which is also used for pip when it is a console script of that interpreter.
+
+    Args:
+        cmd (str): executable whose version is to be found
+
+    Returns:
+        list: containing the version information output
+    """
+    executable_path = _which(cmd, os.environ.get("PATH"))
+    if cmd in PYTHON_EXECUTABLES:
+        return [_probe_python(executable_path)[0]]
+
+    if cmd == "pip":
+        interpreter = _console_script_interpreter(executable_path)
+        if interpreter is not None:
+            pip_version = _probe_python(interpreter)[1]
+            if pip_version is not None:
+                return [pip_version]
+
+    real_path = os.path.realpath(executable_path)
+    if real_path not in _VERSION_CACHE:
+        _VERSION_CACHE[real_path] = exec_command([executable_path, "--version"])
+    return _VERSION_CACHE[real_path]
+
+
+def _probe_python(executable_path: str) -> tuple:
+    """Runs PYTHON_PROBE once per distinct interpreter
+
+    Args:
+        executable_path (str): path to the python interpreter
+
+    Returns:
+        tuple: outputs for the python version and pip version, the latter being None
+        if pip is not installed for the interpreter
+    """
+    # Interpreters sharing a binary but living in different directories (e.g. venvs)
+    # can have different packages, hence the directory is part of the key.
+    key = (
+        os.path.dirname(os.path.abspath(executable_path)),
+        os.path.realpath(executable_path),
+    )
+    if key not in _PYTHON_PROBE_CACHE:
+        probe = exec_command([executable_path, "-c", PYTHON_PROBE])[0]
+        lines = probe.output.splitlines()
+        if probe.isError or not lines:
+            _PYTHON_PROBE_CACHE[key] = (probe, None)
+        else:
+            _PYTHON_PROBE_CACHE[key] = (
+                cmd_only_output(probe.command, lines[0], False),
+                (
+                    cmd_only_output(probe.command, lines[1], False)
+                    if len(lines) > 1
+                    else None
+                ),
             )
-        except TimeoutError:
-            output.append(cmd_only_output(cmd, f"{cmd} command timed out!", True))
-    return output
+    return _PYTHON_PROBE_CACHE[key]
+
+
+def _console_script_interpreter(executable_path: str) -> Optional[str]:
+    """Finds the interpreter of a console script from its shebang line
+
+    Args:
+        executable_path (str): path to the console script
+
+    Returns:
+        str: path to the interpreter, if it lives next to the console script. None otherwise.
+    """
+    with suppress(OSError):
+        with open(executable_path, "rb") as script:
+            first_line = script.read(256).split(b"\n", 1)[0]
+        if first_line.startswith(b"#!"):
+            interpreter = first_line[2:].decode(errors="replace").strip()
+            if os.path.dirname(interpreter) == os.path.dirname(
+                os.path.abspath(executable_path)
+            ) and os.path.isfile(interpreter):
+                return interpreter
+    return None
 
 
 def find_executable_and_version(cmd: str, is_suggestions_optional: bool) -> list:
@@ -460,19 +657,37 @@ def find_executable_and_version(cmd: str, is_suggestions_optional: bool) -> list
 
     if not rep.has_error:
         # Suppressing suggestions/error icon for version command
-        version = process_output(exec_command, True, f"{cmd} --version")
+        version = process_output(find_version, True, cmd)
         output.append("\n" + str(version))
     return output
 
 
-output: str = ""
-output += list_matlab()
-output += list_matlab_proxy_on_path()
-output += check_python_and_pip_installed()
-output += list_xvfb()
-output += os_info()
-output += list_conda_related_information()
-output += list_installed_packages()
-output += list_env_vars()
-output += collect_logs_from_logfile()
-print(output)
+def print_environment_info():
+    """Gathers all the sections of the report concurrently and prints them in order"""
+    sections = [
+        list_matlab,
+        list_matlab_proxy_on_path,
+        check_python_and_pip_installed,
+        list_xvfb,
+        os_info,
+        list_conda_related_information,
+        list_installed_packages,
+        list_env_vars,
+        collect_logs_from_logfile,
+    ]
+    _get_terminal_size.cache_clear()
+    # Sections spend most of their time waiting on subprocesses, so running them on
+    # worker threads overlaps those waits.
+    with ThreadPoolExecutor(max_workers=len(sections)) as executor:
+        print("".join(executor.map(_render, sections)))
+
+
+def _render(section) -> str:
+    """Runs a report section against its own buffer, so sections can run concurrently"""
+    out = io.StringIO()
+    section(out)
+    return out.getvalue()
+
+
+if __name__ == "__main__":
+    print_environment_info()